@@ -1,6 +1,7 @@
 
 from .basic_types import Amount, Balance, BuyOffer, Currency, Market, Offer, \
-                         Price, SellOffer, Ticker, Trade
+                         Price, SellOffer, Ticker, Trade, buy_from_price, \
+                         sell_from_price
 from .orderbook import Orderbook
 from .interfaces import ExchangeInterface
 
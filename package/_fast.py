@@ -0,0 +1,101 @@
+"""Compiled aggregation kernels for the order book.
+
+The functions in this module scan structure-of-arrays views of one
+order book side: a `prices` array and a matching `amounts` array, both
+fixed-point ints (scaled by Offer.SCALE) and sorted in book order.
+
+When numba and numpy are installed, the kernels are JIT-compiled to
+native loops over int64 arrays. Without them, the same functions run
+as pure Python over plain lists, so the package has no hard dependency
+on either.
+"""
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    from numba import njit
+except ImportError:
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit when numba is unavailable."""
+        if args and callable(args[0]):
+            return args[0]
+
+        def decorator(func):
+            return func
+
+        return decorator
+
+
+def as_int64_array(values):
+    """Packs an iterable of scaled ints into the fastest available
+    array type: an int64 numpy array if numpy is installed, otherwise a
+    plain list.
+
+    Args:
+        values: An iterable of fixed-point int values.
+
+    Returns:
+        A sequence suitable for the kernels in this module.
+    """
+    if numpy is not None:
+        return numpy.fromiter(values, dtype=numpy.int64)
+
+    return list(values)
+
+
+@njit(cache=True)
+def vwap_top_n(prices, amounts, n):     # pragma: no cover - trivial loop
+    """Computes the volume-weighted average price over the top n levels.
+
+    Args:
+        prices: Fixed-point prices in book order.
+        amounts: Fixed-point base amounts, aligned with prices.
+        n: Number of levels from the top of the book to include.
+
+    Returns:
+        The VWAP as a fixed-point int, or 0 if the levels hold no
+        volume.
+    """
+    if n > len(prices):
+        n = len(prices)
+
+    # A single price * amount term carries 10^16 of scaling and
+    # overflows int64 at realistic magnitudes, so the notional is
+    # accumulated as float64. The division below brings the result
+    # back to one 10^8 scale, well within float64 precision.
+    notional = 0.0
+    volume = 0
+
+    for i in range(n):
+        notional += 1.0 * prices[i] * amounts[i]
+        volume += amounts[i]
+
+    if volume == 0:
+        return 0
+
+    return int(notional / volume)
+
+
+@njit(cache=True)
+def depth_at_price(prices, amounts, limit):     # pragma: no cover
+    """Sums the base volume available at or better than a limit price.
+
+    Args:
+        prices: Fixed-point prices in book order (best first).
+        amounts: Fixed-point base amounts, aligned with prices.
+        limit: Fixed-point limit price, signed like the prices.
+
+    Returns:
+        The cumulative base amount as a fixed-point int.
+    """
+    volume = 0
+
+    for i in range(len(prices)):
+        if prices[i] > limit:
+            break
+        volume += amounts[i]
+
+    return volume
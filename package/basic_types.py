@@ -1,15 +1,19 @@
-from abc import ABCMeta, abstractmethod
+import itertools
+
+from dataclasses import dataclass
 from datetime import datetime
-from decimal import Decimal
-from decimal import getcontext as decimal_getcontext
+from decimal import Context, Decimal, localcontext
 from typing import NamedTuple
 
-decimal_getcontext().prec = 8
-
 
 Amount = Decimal
 Price = Decimal
 
+#: Context for all Decimal arithmetic in this package. Passed to
+#: localcontext where needed instead of mutating the global (per
+#: thread) context at import time.
+_DECIMAL_CONTEXT = Context(prec=8)
+
 
 class Currency(NamedTuple):
     """A currency (and issuer)."""
@@ -17,8 +21,8 @@ class Currency(NamedTuple):
     issuer: str = ''
 
     def __str__(self):
-        template = '{:s}.{:s}' if self.issuer else '{:s}'
-        return template.format(*self)
+        return f'{self.symbol}.{self.issuer}' if self.issuer \
+            else self.symbol
 
 
 class Balance(NamedTuple):
@@ -33,31 +37,61 @@ class Market(NamedTuple):
     counter: Currency
 
     def __str__(self):
-        return '{!s:s}/{!s:s}'.format(*self)
+        return f'{self.base}/{self.counter}'
 
 
-class Offer(metaclass=ABCMeta):
-    # https://stackoverflow.com/a/31439126
+class Offer:
 
-    def __init__(self, base_amount: Amount, counter_amount: Amount):
-        self.base_amount = Amount(base_amount)
-        self.base_remaining = Amount(base_amount)
-        self.counter_amount = Amount(counter_amount)
-        self.counter_remaining = Amount(counter_amount)
+    # Slots cut the per-offer memory roughly in half (no instance
+    # __dict__) and make attribute access a fixed-offset load, which
+    # adds up with thousands of live offers per market. _sort_key is
+    # attached by the order book on insertion.
+    __slots__ = ('base_amount', 'base_remaining',
+                 'counter_amount', 'counter_remaining',
+                 'price', '_price', '_sort_key')
 
-    @property
-    @abstractmethod
-    def is_bid(self) -> bool:
-        raise NotImplementedError('Offer is an abstract class. '
-                                  'Use BuyOffer or SellOffer instead.')
+    #: Flag for the offer type: True for bids, False for asks. Set as
+    #: a plain class attribute on BuyOffer/SellOffer, so reads are a
+    #: direct attribute fetch rather than a property call.
+    is_bid: bool = None
 
-    @property
-    def price(self) -> Price:
-        return self.counter_amount / self.base_amount
+    #: Fixed-point scaling factor. Amounts and prices are carried
+    #: internally as plain ints scaled by SCALE, so that the hot
+    #: order book paths compare and negate machine integers instead
+    #: of Decimal objects.
+    SCALE = 10 ** 8
+
+    def __init__(self, base_amount: Amount, counter_amount: Amount):
+        if type(self) is Offer:
+            raise TypeError('Offer is an abstract class. '
+                            'Use BuyOffer or SellOffer instead.')
+
+        # Offer construction is compute-bound on Decimal: conversions
+        # and the price division below dominate ingestion profiles.
+        # Convert each amount at most once and alias the remaining
+        # fields; Decimal is immutable, so sharing the object is safe.
+        if type(base_amount) is not Amount:
+            base_amount = Amount(base_amount)
+        if type(counter_amount) is not Amount:
+            counter_amount = Amount(counter_amount)
+
+        self.base_amount = self.base_remaining = base_amount
+        self.counter_amount = self.counter_remaining = counter_amount
+
+        with localcontext(_DECIMAL_CONTEXT):
+            base_scaled = int(self.base_amount * self.SCALE)
+            counter_scaled = int(self.counter_amount * self.SCALE)
+            self._price = counter_scaled * self.SCALE // base_scaled
+
+            # The amounts never change, so the price is computed once
+            # here rather than on every access. price_remaining stays
+            # lazy because the remaining amounts do change.
+            self.price = Price(self._price) / self.SCALE
 
     @property
     def price_remaining(self) -> Price:
-        return self.counter_remaining / self.base_remaining
+        with localcontext(_DECIMAL_CONTEXT):
+            return self.counter_remaining / self.base_remaining
 
     @property
     def is_partial(self) -> bool:
@@ -70,17 +104,58 @@ class Offer(metaclass=ABCMeta):
 
 
 class BuyOffer(Offer):
+    __slots__ = ()
     is_bid = True
 
 
 class SellOffer(Offer):
+    __slots__ = ()
     is_bid = False
 
 
-class Trade(NamedTuple):
-    """A Trade is an Offer that has been executed."""
-    time: datetime
-    offer: Offer
+# Module-level factories for tick-ingestion loops. They build the
+# offer directly on the concrete class, skipping the classmethod
+# descriptor dispatch that Offer.from_price pays per call.
+
+def buy_from_price(base_amount: Amount, price: Price) -> BuyOffer:
+    """Creates a buy offer of the given base amount at the given price."""
+    return BuyOffer(base_amount, base_amount * price)
+
+
+def sell_from_price(base_amount: Amount, price: Price) -> SellOffer:
+    """Creates a sell offer of the given base amount at the given price."""
+    return SellOffer(base_amount, base_amount * price)
+
+
+_trade_seq = itertools.count()
+
+class Trade(NamedTuple('Trade', [('time', datetime), ('seq', int),
+                                 ('offer', Offer)])):
+    """A Trade is an Offer that has been executed.
+
+    Trades compare as plain tuples: by time first, then by a monotonic
+    sequence number. The sequence number guarantees a total order even
+    when two trades share a timestamp, so trades can be kept in sorted
+    containers without a key function.
+    """
+
+    def __new__(cls, time: datetime, offer: Offer,
+                seq: int = None) -> 'Trade':
+        """Creates a record of an executed offer.
+
+        Args:
+            time: Time at which the offer was executed.
+            offer: The executed offer.
+            seq: Tiebreaker for trades sharing a timestamp. Assigned
+                from a monotonic counter when omitted.
+
+        Returns:
+            The trade record.
+        """
+        if seq is None:
+            seq = next(_trade_seq)
+
+        return cls.__bases__[0].__new__(cls, time, seq, offer)
 
     @property
     def is_bid(self) -> bool:
@@ -88,7 +163,8 @@ class Trade(NamedTuple):
         return self.offer.is_bid
 
 
-class Ticker(NamedTuple):
+@dataclass(slots=True, frozen=True)
+class Ticker:
     time: datetime
     bid: Price
     ask: Price
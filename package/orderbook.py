@@ -1,16 +1,32 @@
+# cython: language_level=3
+# This module is Cython pure-Python mode compatible: setup.py compiles
+# it to a C extension when Cython is available, and the same source
+# runs unmodified on a stock interpreter otherwise.
+
 import itertools
+import time
+
+from bisect import bisect_left, insort
+from operator import attrgetter
+from typing import Iterable, List, NamedTuple, Tuple
 
-from decimal import Decimal
-from typing import List, NamedTuple
+from sortedcontainers import SortedKeyList
 
-from sortedcontainers import SortedDict
+from ._fast import as_int64_array, depth_at_price, vwap_top_n
+from .basic_types import Amount, Market, Offer, Price
 
-from .basic_types import Market, Offer
 
+_offer_sort_key = attrgetter('_sort_key')
 
-_offer_token_id = itertools.count()
+#: Second component of OfferToken.time. The monotonic clock alone can
+#: return the same value for back-to-back calls (notoriously so on
+#: Windows, where it ticks every ~16 ms), and tokens must be unique:
+#: they key Orderbook._offers and are the caller's removal handle.
+_offer_token_seq = itertools.count()
 
-class OfferToken(NamedTuple):
+class OfferToken(NamedTuple('OfferToken',
+                            [('price', int), ('time', Tuple[int, int]),
+                             ('is_bid', bool)])):
     """Token for an offer in the order book.
 
     The token uniquely represents one offer placed in the order book. As
@@ -21,37 +37,147 @@ class OfferToken(NamedTuple):
     insertion order.
 
     Note that the imposed sorting order differs between bid and ask
-    offers, always placing the "most attractive" offers at the start. 
+    offers, always placing the "most attractive" offers at the start.
 
     Attrs:
-        price: Price of the offer. Negative for bid offers, because a
-            high price is favourable and should thus be sorted to the
-            start.
-        time: Sequence number of the time the offer was added to the
-            order book.
+        price: Price of the offer as a fixed-point int (scaled by
+            Offer.SCALE). Negative for bid offers, because a high price
+            is favourable and should thus be sorted to the start.
+        time: Pair of a monotonic timestamp (in nanoseconds) of when
+            the offer was added to the order book and a sequence
+            number that keeps tokens unique when the clock returns the
+            same value for back-to-back insertions.
+        is_bid: Flag for the offer type: True for bids, False for asks.
+            Precomputed at creation, so look-ups read a plain tuple
+            field instead of re-deriving the flag from the price.
     """
-    price: Decimal
-    time: int
 
     def __new__(cls, offer: Offer) -> 'OfferToken':
         """Creates a token for an offer.
 
         Args:
-            time: A sequence number reflecting insertion order.
             offer: The offer this token will represent.
 
         Returns:
             A token for the offer.
         """
-        price = -offer.price if offer.is_bid else offer.price
+        # Branchless conditional negate: is_bid maps to a mask of 0 or
+        # -1, and (x ^ mask) - mask flips the sign exactly when the
+        # mask is -1. Bids and asks arrive roughly 50/50, so this
+        # avoids a data-dependent branch on the hot insert path.
+        mask = -offer.is_bid
+        price = (offer._price ^ mask) - mask
 
-        # https://stackoverflow.com/a/3474156
-        return cls.__bases__[0].__new__(cls, price, next(_offer_token_id))
+        # Calling tuple.__new__ directly skips the __bases__ lookup
+        # that the usual super() idiom pays for on every token.
+        return tuple.__new__(cls, (price,
+                                   (time.monotonic_ns(),
+                                    next(_offer_token_seq)),
+                                   offer.is_bid))
 
-    @property
-    def is_bid(self) -> bool:
-        """Flag for the offer type: True for bids, False for asks."""
-        return self.price < 0
+
+class _SortedOffers:
+    """One side of an order book, sorted by the offers' sort keys.
+
+    The representation adapts to the book size. Small books keep their
+    offers in a single contiguous list maintained with bisect, whose
+    constant factors beat SortedKeyList's segmented storage. Once the
+    book outgrows _THRESHOLD entries, the offers migrate into a
+    SortedKeyList and stay there.
+    """
+
+    _THRESHOLD = 500
+
+    def __init__(self, offers: Iterable[Offer] = ()) -> None:
+        """Creates a book side holding the given offers.
+
+        Args:
+            offers: Offers to populate the side with. They need not be
+                presorted.
+        """
+        offers = sorted(offers, key=_offer_sort_key)
+
+        if len(offers) > self._THRESHOLD:
+            # The input is presorted, so construction takes the O(N)
+            # bulk load path.
+            offers = SortedKeyList(offers, key=_offer_sort_key)
+
+        self._offers = offers
+
+    def __len__(self) -> int:
+        return len(self._offers)
+
+    def __iter__(self):
+        return iter(self._offers)
+
+    def __getitem__(self, index):
+        return self._offers[index]
+
+    def add(self, offer: Offer) -> None:
+        """Inserts an offer at its sorted position."""
+        offers = self._offers
+
+        if type(offers) is not list:
+            offers.add(offer)
+        elif len(offers) < self._THRESHOLD:
+            insort(offers, offer, key=_offer_sort_key)
+        else:
+            self._offers = SortedKeyList(offers, key=_offer_sort_key)
+            self._offers.add(offer)
+
+    def update(self, offers: List[Offer]) -> None:
+        """Inserts multiple offers, presorting them for a bulk merge.
+
+        Args:
+            offers: Offers to insert. The list is sorted in place.
+        """
+        offers.sort(key=_offer_sort_key)
+
+        current = self._offers
+
+        if type(current) is not list:
+            current.update(offers)
+            return
+
+        # Merging two sorted runs is Timsort's best case.
+        current.extend(offers)
+        current.sort(key=_offer_sort_key)
+
+        if len(current) > self._THRESHOLD:
+            self._offers = SortedKeyList(current, key=_offer_sort_key)
+
+    def remove(self, offer: Offer) -> None:
+        """Removes an offer.
+
+        Args:
+            offer: A previously inserted offer.
+
+        Raises:
+            ValueError if the offer is not in this book side.
+        """
+        offers = self._offers
+
+        if type(offers) is not list:
+            offers.remove(offer)
+            return
+
+        key = offer._sort_key
+        index = bisect_left(offers, key, key=_offer_sort_key)
+
+        # Scan the whole run of equal keys: with duplicate sort keys
+        # the target may sit anywhere within the run, not just at the
+        # leftmost position.
+        while index < len(offers) and offers[index]._sort_key == key:
+            if offers[index] is offer:
+                del offers[index]
+                return
+            index += 1
+
+        raise ValueError('{0!r} not in list'.format(offer))
+
+    def clear(self) -> None:
+        """Removes all offers."""
+        self._offers = list()
 
 
 class Orderbook:
@@ -59,31 +185,36 @@ class Orderbook:
     
     Attrs:
         asks: All listed offers to sell base for counter currency,
-            sorted by price in descending order. The implementation uses
-            a SortedDict that maps from OfferToken to Offer.
+            sorted by price in ascending order. The implementation uses
+            a _SortedOffers container of Offers, ordered by the
+            precomputed (signed price, insertion time) tuple attached
+            to each offer on insertion. Comparisons are thus plain int
+            tuple compares.
         bids: All listed offers to buy base for counter currency, sorted
-            by price in ascending order. Like for asks, the
-            implementation uses a SortedDict.
+            by price in descending order. Like for asks, the
+            implementation uses a _SortedOffers container.
         market: Offers listed in an orderbook trade base currency
             against counter currency. This currency pair is the market.
-        tick: A generator of monotonically increasing numbers.
     """
 
     def __init__(self, market: Market) -> None:
         """Creates an empty order book.
-        
+
         Args:
             market: Provides the currency (asset) pair for trade.
         """
         self.market = market
 
-        self.asks = SortedDict()
-        self.bids = SortedDict()
+        self.asks = _SortedOffers()
+        self.bids = _SortedOffers()
+
+        self._offers = dict()   # Dict[OfferToken,Offer]
 
     def clear(self) -> None:
         """Removes all offers from the order book."""
         self.asks.clear()
         self.bids.clear()
+        self._offers.clear()
 
     def add(self, offer: Offer) -> OfferToken:
         """Adds an offer to the order book.
@@ -101,10 +232,13 @@ class Orderbook:
         """
         token = OfferToken(offer)
 
+        offer._sort_key = (token.price, token.time)
+        self._offers[token] = offer
+
         if offer.is_bid:
-            self.bids[token] = offer
+            self.bids.add(offer)
         else:
-            self.asks[token] = offer
+            self.asks.add(offer)
 
         return token
 
@@ -119,24 +253,122 @@ class Orderbook:
         """
         tokens = list()     # List[OfferToken]
 
-        asks = list()       # List[Tuple[OfferToken,Offer]]
+        asks = list()       # List[Offer]
         bids = list()
 
         for offer in offers:
             token = OfferToken(offer)
 
+            offer._sort_key = (token.price, token.time)
+            self._offers[token] = offer
+
             tokens.append(token)
 
             if offer.is_bid:
-                bids.append((token, offer))
+                bids.append(offer)
             else:
-                asks.append((token, offer))
+                asks.append(offer)
 
         self.asks.update(asks)
         self.bids.update(bids)
 
         return tokens
 
+    def replace_snapshot(self, bids: List[Offer],
+                         asks: List[Offer]) -> List[OfferToken]:
+        """Replaces the entire book contents with a snapshot.
+
+        Exchanges commonly publish full order book snapshots every few
+        seconds. Building fresh book sides in one bulk load and
+        swapping them in is considerably faster than clear() followed
+        by per-offer add() calls, and readers never observe a
+        half-built book.
+
+        Args:
+            bids: All bid offers of the snapshot.
+            asks: All ask offers of the snapshot.
+
+        Returns:
+            A list of tokens, one for each offer (bids first, then
+            asks, each in input order).
+        """
+        tokens = list()     # List[OfferToken]
+        offers = dict()     # Dict[OfferToken,Offer]
+
+        for offer in bids + asks:
+            token = OfferToken(offer)
+
+            offer._sort_key = (token.price, token.time)
+            offers[token] = offer
+
+            tokens.append(token)
+
+        new_bids = _SortedOffers(bids)
+        new_asks = _SortedOffers(asks)
+
+        self.bids = new_bids
+        self.asks = new_asks
+        self._offers = offers
+
+        return tokens
+
+    @property
+    def best_ask(self) -> Offer:
+        """Fetches the most attractive (lowest priced) ask offer."""
+        return self.asks[0]
+
+    @property
+    def best_bid(self) -> Offer:
+        """Fetches the most attractive (highest priced) bid offer."""
+        return self.bids[0]
+
+    def vwap(self, depth: int, is_bid: bool = False) -> Price:
+        """Computes the volume-weighted average price over the top of
+        one side of the book.
+
+        Args:
+            depth: Number of levels from the top of the book to
+                include.
+            is_bid: Side to aggregate: True for bids, False for asks.
+
+        Returns:
+            The VWAP over the remaining base amounts of the top levels,
+            or zero if those levels hold no volume.
+        """
+        side = self.bids if is_bid else self.asks
+
+        prices = as_int64_array(offer._price for offer in side)
+        amounts = as_int64_array(
+            int(offer.base_remaining * Offer.SCALE) for offer in side)
+
+        # int() strips the numpy int64 the kernels return when numpy
+        # is installed; Decimal only accepts plain ints.
+        return Price(int(vwap_top_n(prices, amounts, depth))) / Offer.SCALE
+
+    def cumulative_volume(self, price: Price, is_bid: bool = False) -> Amount:
+        """Sums the base volume offered at the given price or better.
+
+        "Better" is cheaper for asks and dearer for bids.
+
+        Args:
+            price: The limit price up to which volume is counted.
+            is_bid: Side to aggregate: True for bids, False for asks.
+
+        Returns:
+            The cumulative remaining base amount.
+        """
+        side = self.bids if is_bid else self.asks
+        sign = -1 if is_bid else 1
+
+        prices = as_int64_array(sign * offer._price for offer in side)
+        amounts = as_int64_array(
+            int(offer.base_remaining * Offer.SCALE) for offer in side)
+
+        limit = sign * int(Amount(price) * Offer.SCALE)
+
+        return Amount(int(depth_at_price(prices, amounts, limit))) \
+            / Offer.SCALE
+
     def remove(self, token: OfferToken):
         """Removes an open offer from the order book.
         
@@ -146,7 +378,9 @@ class Orderbook:
         Raises:
             KeyError if the token/offer is not in the order book.
         """
+        offer = self._offers.pop(token)
+
         if token.is_bid:
-            del self.bids[token]
+            self.bids.remove(offer)
         else:
-            del self.asks[token]
+            self.asks.remove(offer)
@@ -1,6 +1,6 @@
 from typing import List
 
-from sortedcontainers import SortedListWithKey
+from sortedcontainers import SortedList
 
 from .basic_types import Market, Trade
 
@@ -21,7 +21,7 @@ class History:
         """
         self.market = market
 
-        self.trades = SortedListWithKey(Trade.sort_by_time)
+        self.trades = SortedList()
 
     @property
     def last(self) -> Trade:
@@ -0,0 +1,18 @@
+from setuptools import find_packages, setup
+
+try:
+    from Cython.Build import cythonize
+except ImportError:
+    # Without Cython the package installs as plain Python; the order
+    # book module is written in pure-Python mode and runs unmodified.
+    ext_modules = []
+else:
+    ext_modules = cythonize(['package/orderbook.py'], language_level=3)
+
+setup(
+    name='marketdata',
+    version='0.1.0',
+    packages=find_packages(exclude=['tests']),
+    install_requires=['sortedcontainers'],
+    ext_modules=ext_modules,
+)
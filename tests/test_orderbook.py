@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+# Copyright 2017 Paul Koppen
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Tests for the order book module.
+
+"""
+from decimal import Decimal
+
+from package import Currency, Market, Orderbook, SellOffer
+
+
+def test_vwap_realistic_magnitudes():
+    # Regression: a single price * amount term at these magnitudes
+    # (0.1 base units at price 50000) exceeds the int64 range once
+    # both factors carry the fixed-point scale, so the kernel must not
+    # accumulate the raw product as int64.
+    orderbook = Orderbook(Market(Currency('BTC'), Currency('USD')))
+
+    orderbook.add(SellOffer(Decimal('0.1'), Decimal('5000')))
+    orderbook.add(SellOffer(Decimal('0.2'), Decimal('10002')))
+
+    # (0.1 * 50000 + 0.2 * 50010) / 0.3
+    expected = Decimal('50006.666666')
+    assert abs(orderbook.vwap(2) - expected) < Decimal('0.001')
+
+
+def test_cumulative_volume_realistic_magnitudes():
+    orderbook = Orderbook(Market(Currency('BTC'), Currency('USD')))
+
+    orderbook.add(SellOffer(Decimal('0.1'), Decimal('5000')))
+    orderbook.add(SellOffer(Decimal('0.2'), Decimal('10002')))
+
+    assert orderbook.cumulative_volume(Decimal('50000')) == Decimal('0.1')
+    assert orderbook.cumulative_volume(Decimal('50010')) == Decimal('0.3')